@@ -17,6 +17,7 @@ class Configuration:
         self.new_file_name = 'new.txt'
         self.hardcore_mode = False
         self.max_undo = 50
+        self.max_undo_bytes = 8 << 20   # Text held by the undo stack, per tab
         # Textbox appearance
         self.font = {                   # This should get unpacked into the font.Font() constructor 
             'family': 'Consolas',       # usint the ** operator ie. **cf.font
@@ -42,3 +42,20 @@ Themes = SimpleNamespace(
         syn_purple = '#665FAB',
     ),
 )
+
+# Widget options built once per theme so each widget can be styled with a 
+# single configure call instead of spelling the colours out every time
+for colors in (Themes.light, Themes.dark):
+    colors.text_config = {
+        'background': colors.text_background,
+        'foreground': colors.text_foreground,
+        'highlightbackground': colors.text_background,  # These 2 remove the quasi borders 
+        'highlightcolor': colors.text_background,       # around the textbox
+        'padx': 5,
+        'pady': 5,
+        }
+    colors.line_number_config = {
+        'bg': colors.background,
+        'highlightbackground': colors.background,
+        }
+del colors
@@ -27,10 +27,16 @@ class SyntaxMarker:
         self.syntax_color_list = ['red', 'green', 'blue', 'orange', 'purple', 'yellow', 'cyan']
 
 
-    def tagHighlight(self):
-        start = "1.0"
-        end = "end"
-         
+    def rehighlight(self, start:str, end:str) -> None:
+        ''' Re-run the highlighter over a slice of the document rather than the
+            whole thing. Tags are cleared from the slice first so a keyword 
+            that has been typed over loses its colour. '''
+        for tag in self.tags:
+            self.textbox.tag_remove(tag, start, end)
+        self.tagHighlight(start, end)
+        self.scan(start, end)
+
+    def tagHighlight(self, start:str="1.0", end:str="end"):
         for syntax_color, word_list in syntax_words.items():
 
             for word in word_list:
@@ -71,21 +77,19 @@ class SyntaxMarker:
         return 1
  
  
-    def scan(self):
-        start = "1.0"
-        end = "end"
+    def scan(self, start:str="1.0", end:str="end"):
         mycount = IntVar()
  
         regex_patterns = [r'".*"', r'#.*']
  
         for pattern in regex_patterns:
-            self.textbox.mark_set("start", start)
-            self.textbox.mark_set("end", end)
+            self.textbox.mark_set("scanStart", start)
+            self.textbox.mark_set("scanLimit", end)
  
             num = int(regex_patterns.index(pattern))
  
             while True:
-                index = self.textbox.search(pattern, "start", "end", count=mycount, regexp = True)
+                index = self.textbox.search(pattern, "scanStart", "scanLimit", count=mycount, regexp = True)
  
                 if index == "": break
  
@@ -94,5 +98,5 @@ class SyntaxMarker:
                 elif (num == 0):
                     self.textbox.tag_add(self.tags[3], index, "%s+%sc" % (index, mycount.get()))
  
-                self.textbox.mark_set("start", "%s+%sc" % (index, mycount.get()))
+                self.textbox.mark_set("scanStart", "%s+%sc" % (index, mycount.get()))
  
\ No newline at end of file
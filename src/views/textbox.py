@@ -1,16 +1,36 @@
-from collections import deque
-from tkinter import Text, Canvas, IntVar
+import time
+from tkinter import Text, Canvas, IntVar, TclError
+from tkinter.font import Font
 from tkinter.ttk import Notebook, Scrollbar, Frame
 
 from conf import cf
 from .colors import Themes
 from .syntax import SyntaxMarker
+from .undo import EditOp, UndoStack
+
+
+# Returned by the dev mode proxy call when the widget command failed
+CALL_FAILED = object()
 
 class Textbox(Text):
     ''' This is where the magic happens. This is the text area where the user 
         is typing. This class is responsible for the text area, line numbers, 
         and scrollbars. Syntax highlighting is a beast of it's own and is 
         separated into it's own module. '''
+
+    # Widget commands the proxy raises <<Change>> for. Edits are matched on 
+    # the command name, cursor moves and scrolls on the first couple of args.
+    _change_cmds = frozenset(("insert", "replace", "delete"))
+    _subcmd_change = frozenset((
+        ("mark", "set", "insert"),
+        ("xview", "moveto"),
+        ("xview", "scroll"),
+        ("yview", "moveto"),
+        ("yview", "scroll"),
+        ))
+    # Tk's own undo and redo, which replay their edits through the proxy
+    _native_undo_cmds = frozenset((("edit", "undo"), ("edit", "redo")))
+
     def __init__(self, tabs:Notebook) -> None:
         # tabs is the parent widget
         self.tabs = tabs
@@ -31,10 +51,25 @@ class Textbox(Text):
         self._file_name = cf.new_file_name
         self.tk_name    = ""
         self.changed_since_saved = False
+        self._tab_title_cache = None    # Last title sent to the tab
+
+        # Set while the dirtyStart/dirtyEnd marks hold lines that still need
+        # highlighting. Marks move with the text as lines come and go.
+        self._dirty_pending = False
+        # Highlighting waits for a pause in typing. This holds the pending job.
+        self._hl_after_id = None
+        # Bumped on every edit so a highlight pass can tell if anything changed
+        self._text_version = 0
+        self._last_highlighted_version = 0
+        # Line numbers are redrawn at most once per trip around the event loop
+        self._redraw_pending = False
+        self._redraw_from = None    # First line edited since the last redraw
 
         # Stack for undo/redo
-        self.stack = deque(maxlen = cf.max_undo)
-        self.stackcursor = 0 
+        self.stack = UndoStack(cf.max_undo, cf.max_undo_bytes)
+        self._replaying = False     # Set while undo/redo are editing the text
+        self._suspend_events = False # Holds back the proxy's change events
+        self._last_stackify_ts = 0  # Edits close together get merged into one
 
         # Text area settings
         self._make_text_area(tabs) 
@@ -46,7 +81,11 @@ class Textbox(Text):
 
         # Syntax highlighting. Until this is a little more stable I don't want 
         # it to be the default
-        if cf.enable_syntax_highlighting:
+        self._syntax_on = bool(cf.enable_syntax_highlighting)
+        # The line numbers and undo stack are fed by the proxy, so it goes in
+        # whether or not there is any highlighting to do
+        self._setup_proxy()
+        if self._syntax_on:
             self._setup_syntax_highlighting()
 
     ###              ###
@@ -57,9 +96,10 @@ class Textbox(Text):
     def is_blank(self) -> bool:
         ''' Returns True if the text area has not had a single character entered. 
             By default a text area will house a new line character. So len is not
-            a good way to check if the text area is blank.
+            a good way to check if the text area is blank. Asking where the 
+            text ends saves copying the whole document over from Tcl.
         '''
-        return self.get(1.0, 'end') == '\n'
+        return self.index('end-1c') == '1.0'
     
     @property
     def file_name(self) -> str:
@@ -69,7 +109,13 @@ class Textbox(Text):
     def file_name(self, file_name:str) -> None:
         ''' Updating the filename will also update the tab name '''
         self._file_name = file_name
-        self.tabs.tab(self.tk_name, text=file_name)
+        self._set_tab_title(file_name)
+
+    def _set_tab_title(self, title:str) -> None:
+        ''' Set the tab text, skipping the trip to Tk if it already says that '''
+        if title != self._tab_title_cache:
+            self.tabs.set_properties(self.tk_name, text=title)
+            self._tab_title_cache = title
 
     ###                        ###
     # Underlying file operations #
@@ -125,22 +171,70 @@ class Textbox(Text):
     # the first handful of undo/redo's are at the character level, then the
     # next bunch are at the word level and then statement level. 
     # Implementation has not been thought out yet.
-
-    def stackify(self):
-        self.stack.append(self.get("1.0", "end - 1c"))
-        if self.stackcursor < 9: self.stackcursor += 1
+    #
+    # The stack holds EditOps picked up by the proxy. Typing that runs on 
+    # within half a second is folded into one entry until a space or 
+    # punctuation breaks it up, which gets us roughly word level undo.
+
+    def stackify(self, op:EditOp) -> None:
+        ''' Push an edit onto the undo stack. Anything that was undone is 
+            dropped once a new edit comes in. '''
+        now = time.monotonic()
+        recent = now - self._last_stackify_ts <= 0.5
+        self._last_stackify_ts = now
+        last = self.stack.last
+        if recent and last:
+            merged = self._merge_ops(last, op)
+            if merged:
+                self.stack.replace_last(merged)
+                return
+        self.stack.push(op)
+
+    def _merge_ops(self, last:EditOp, op:EditOp) -> EditOp:
+        ''' Fold op into the previous edit if it carries on the same word. 
+            Returns None when the two should stay separate. '''
+        if last.kind != op.kind or not (last.text.isalnum() and op.text.isalnum()):
+            return None
+        line, col = last.index.split(".")
+        if op.kind == 'insert':
+            # Typing carries on from the end of the last insert
+            if op.index == f"{line}.{int(col) + len(last.text)}":
+                return EditOp('insert', last.index, last.text + op.text)
+        elif op.index == last.index:
+            # Delete key, the text keeps coming in from the right
+            return EditOp('delete', last.index, last.text + op.text)
+        elif op.index == f"{line}.{int(col) - len(op.text)}":
+            # Backspace, working back towards the start of the line
+            return EditOp('delete', op.index, op.text + last.text)
+        return None
  
     def undo(self):
-        if self.stackcursor != 0:
-            self.clear()
-            if self.stackcursor > 0: self.stackcursor -= 1
-            self.insert("0.0", self.stack[self.stackcursor])
+        op = self.stack.undo()
+        if op:
+            self._replay(op, reverse=True)
  
     def redo(self):
-        if len(self.stack) > self.stackcursor + 1:
-            self.clear()
-            if self.stackcursor < 9: self.stackcursor += 1
-            self.insert("0.0", self.stack[self.stackcursor])
+        op = self.stack.redo()
+        if op:
+            self._replay(op)
+
+    def _replay(self, op:EditOp, reverse:bool=False) -> None:
+        ''' Apply an edit to the text, or take it back out if reverse is set.
+            The change events are sent once at the end rather than by each
+            widget call along the way. '''
+        self._replaying = True
+        self._suspend_events = True
+        try:
+            if (op.kind == 'insert') != reverse:
+                self.insert(op.index, op.text)
+            else:
+                self.delete(op.index, f"{op.index}+{len(op.text)}c")
+        finally:
+            self._replaying = False
+            self._suspend_events = False
+        self.event_generate("<<Change>>", when="tail")
+        if self._syntax_on:
+            self.event_generate("<<DirtyChange>>", when="tail")
  
 
     ####################
@@ -153,26 +247,25 @@ class Textbox(Text):
             a better option. The functions called from here tend to be blocking
             and will cause user input to be delayed. 
         
-            Event state 16 is when no modifier keys are pressed. It will not 
-            fire when shift and an alphanumeric key is pressed.'''
+            Only keys that put text in or take it out mark the document as 
+            changed. Modifiers, arrows and function keys just move the cursor.'''
         
-        # Check if the document has been updated since last saved
-        if not self.changed_since_saved and event.state == 16:
-            self.changed_since_saved = True
-            self.tabs.set_properties(self.tk_name, text=f'{self.file_name} *')
-
         # Put a delay on this so the cursor has a chance to move with the character
-        # placed on the screen before we update the position. 
+        # placed on the screen before we update the position. Arrow keys move it
+        # too so this runs for every key.
         self.after(10, self.tabs.view.footer.update_pos)
 
-        # Pushes the current state of the document onto the stack for undo
-        self.stackify()
-        
-        # This is insane. The syntax highlighting goes over the whole document 
-        # every keystroke
-        if cf.enable_syntax_highlighting:
-            self.syntax.tagHighlight()
-            self.syntax.scan()
+        is_text_key = (
+            (len(event.char) > 0 and event.char.isprintable()) or 
+            event.keysym in ('Return', 'BackSpace', 'Delete', 'Tab')
+            )
+        if not is_text_key:
+            return
+
+        # Check if the document has been updated since last saved
+        if not self.changed_since_saved:
+            self.changed_since_saved = True
+            self._set_tab_title(f'{self.file_name} *')
 
     ## Scrollbar events ##
     def hide_unused_scrollbars(self) -> None:
@@ -195,7 +288,34 @@ class Textbox(Text):
                 self.horiz_scroll.pack(expand=True, side='right', fill='x')
 
     def _on_change(self, event):
-        self.linenumbers.redraw()
+        ''' One keystroke can fire off several changes. Rather than redraw for
+            each of them, queue a single redraw for when things go idle. '''
+        if self._redraw_pending:
+            return
+        self._redraw_pending = True
+        self.after_idle(self._do_redraw)
+
+    def _do_redraw(self) -> None:
+        self._redraw_pending = False
+        dirty_start, self._redraw_from = self._redraw_from, None
+        self.linenumbers.redraw(dirty_start)
+
+    def _on_dirty_change(self, event) -> None:
+        ''' Push the highlight pass back until typing settles down. A burst of 
+            keystrokes ends up as a single pass over the combined range. '''
+        if self._hl_after_id:
+            self.after_cancel(self._hl_after_id)
+        self._hl_after_id = self.after(75, self._run_highlight)
+
+    def _run_highlight(self) -> None:
+        ''' Highlight only the lines touched since the last pass '''
+        self._hl_after_id = None
+        if self._text_version == self._last_highlighted_version or not self._dirty_pending:
+            return
+        first, last = self.index("dirtyStart"), self.index("dirtyEnd")
+        self._dirty_pending = False
+        self._last_highlighted_version = self._text_version
+        self.syntax.rehighlight(first, last)
 
     ###                 ###
     # Constructor helpers #
@@ -207,22 +327,11 @@ class Textbox(Text):
             colors = Themes.dark
         else:
             colors = Themes.light
-        self.configure(
-            background=colors.text_background,          
-            foreground=colors.text_foreground,
-            highlightbackground=colors.text_background, # These 2 remove the quasi borders 
-            highlightcolor=colors.text_background,      # around the textbox
-            font=self.font,
-            padx=5, 
-            pady=5)
+        self.configure(font=self.font, **colors.text_config)
         self.pack(expand=True, fill='both')
         tabs.add(self.frame)
             
-        self.linenumbers.itemconfigure("lineno", fill=colors.text_foreground)
-        self.linenumbers.config(
-            bg=colors.background, 
-            highlightbackground=colors.background
-            )
+        self.linenumbers.config(**colors.line_number_config)
 
     def _make_line_numbers(self) -> None:
         ''' Add line numbers Canvas to the text area '''
@@ -254,55 +363,160 @@ class Textbox(Text):
         self.horiz_scroll.config(command=self.xview)
         self.vert_scroll.config(command=self.yview)
 
-    def _setup_syntax_highlighting(self) -> None:
+    def _setup_proxy(self) -> None:
         ''' This creates a proxy method for the text widget that will 
-            intercept any events and call the syntax highlighter. 
+            intercept any events and pass edits on to the line numbers, undo
+            stack and syntax highlighter. 
             I would like to get rid of the proxy because it does not play well 
             with try catch blocks. Something will get caught in the proxy and
             fail in the original. 
         '''
-        self.syntax = SyntaxMarker(self)
         # create a proxy for the underlying widget
         self._orig = self._w + "_orig"
         self.tk.call("rename", self._w, self._orig)
+        # Dev mode is settled here once rather than checked on every call 
+        # that goes through the proxy
+        self._call_orig = self._call_orig_dev if cf.dev_mode else self.tk.call
         self.tk.createcommand(self._w, self._proxy_for_line_numbers)
 
+    def _setup_syntax_highlighting(self) -> None:
+        ''' Hook the syntax highlighter up to the edits seen by the proxy '''
+        self.syntax = SyntaxMarker(self)
+        # Ends of the range waiting to be highlighted. The gravities keep text
+        # typed right at either end inside the range.
+        self.mark_set("dirtyStart", "1.0")
+        self.mark_gravity("dirtyStart", "left")
+        self.mark_set("dirtyEnd", "1.0")
+        self.mark_gravity("dirtyEnd", "right")
+        self.bind("<<DirtyChange>>", self._on_dirty_change)
+
     def _proxy_for_line_numbers(self, *args):
         ''' This proxy currently works to enable the line numbers to update '''
         # let the actual widget perform the requested action
         
         # An event at the Text widget will be sent to the widget. The event
         # will be intercepted by the proxy and passed to the original widget. 
-        
-        cmd = (self._orig,) + args   # Here the command is rebuilt
 
-        # This is a really bad idea. I want to crash the program if something is bad. 
-        # But the proxy prevents other try blocks from working. Also if the program
-        # crashes it will not save the file. This proxy business is balls and has to go. 
-        if cf.dev_mode:
+        # Edits need to know where they land before the widget shuffles the 
+        # marks about. Symbolic indices like 'insert' will have moved after.
+        is_edit = args[0] in self._change_cmds
+        if is_edit:
             try:
-                result = self.tk.call(cmd)   # and executed with the original widget
-            except Exception as e:
-                print(e)
-                print(cmd)
-        else:
-            result = self.tk.call(cmd)
-
+                index = self._clamp_index(args[1])
+                edit_line = int(index.split(".")[0])
+                if args[0] == "delete":
+                    inserted = ""
+                else:
+                    # insert is (index, chars, tags, chars, ...) and replace has an 
+                    # extra end index in front. Tag lists sit between the chunks of text. 
+                    first_chunk = 2 if args[0] == "insert" else 3
+                    inserted = "".join(str(chars) for chars in args[first_chunk::2])
+                # Undo/redo don't get recorded or they would undo themselves
+                ops = [] if self._replaying else self._edit_ops(args, index, inserted)
+            except TclError:
+                # A bad index, like sel.first with nothing selected. Skip the
+                # tracking and let the call below fail the usual way.
+                is_edit = False
+
+        # Tk's own undo/redo run their edits back through this proxy. Those
+        # aren't new edits so they are kept off the custom undo stack.
+        native_undo = args[:2] in self._native_undo_cmds
+        if native_undo:
+            self._replaying = True
+        try:
+            # The args go straight through to the original widget, there is no 
+            # need to build a new command tuple for every call
+            result = self._call_orig(self._orig, *args)
+        finally:
+            if native_undo:
+                self._replaying = False
+        if result is CALL_FAILED:
+            # Nothing was edited so there is nothing to undo or highlight
+            result = None
+            is_edit = False
+
+        # Flag the edited lines for the syntax highlighter and keep the
+        # edits for undo
+        if is_edit:
+            self._text_version += 1
+            for op in ops:
+                self.stackify(op)
+            if self._syntax_on:
+                self._mark_dirty(edit_line, inserted.count("\n"))
+            if self._redraw_from is None or edit_line < self._redraw_from:
+                self._redraw_from = edit_line
+
+        # Undo and redo send their own events once they are done
+        if self._suspend_events:
+            return result
 
         # generate an event if something was added or deleted,
         # or the cursor position changed
-        if (args[0] in ("insert", "replace", "delete") or 
-            args[0:3] == ("mark", "set", "insert") or
-            args[0:2] == ("xview", "moveto") or
-            args[0:2] == ("xview", "scroll") or
-            args[0:2] == ("yview", "moveto") or
-            args[0:2] == ("yview", "scroll")
-        ):
+        if is_edit or args[:2] in self._subcmd_change or args[:3] in self._subcmd_change:
             self.event_generate("<<Change>>", when="tail")
 
+        if is_edit and self._syntax_on:
+            self.event_generate("<<DirtyChange>>", when="tail")
+
         # return what the actual widget returned
         return result 
 
+    def _call_orig_dev(self, *cmd):
+        ''' Dev mode stand in for tk.call in the proxy. Errors get printed and
+            swallowed rather than raised, and CALL_FAILED comes back instead. '''
+        # This is a really bad idea. I want to crash the program if something is bad. 
+        # But the proxy prevents other try blocks from working. Also if the program
+        # crashes it will not save the file. This proxy business is balls and has to go. 
+        try:
+            return self.tk.call(*cmd)
+        except Exception as e:
+            print(e)
+            print(cmd)
+            return CALL_FAILED
+
+    def _clamp_index(self, index:str) -> str:
+        ''' Resolve an index the way the widget will use it for an edit. The 
+            trailing newline can't be touched so anything past it is pulled 
+            back to the end of the text. '''
+        index = str(self.tk.call(self._orig, "index", index))
+        if self.tk.getboolean(self.tk.call(self._orig, "compare", index, ">", "end-1c")):
+            index = str(self.tk.call(self._orig, "index", "end-1c"))
+        return index
+
+    def _edit_ops(self, args:tuple, index:str, inserted:str) -> list:
+        ''' Work out the EditOps a widget command is about to make. This has 
+            to happen before the command runs to grab the text being deleted. 
+            A replace comes out as a delete followed by an insert. '''
+        ops = []
+        if args[0] in ("delete", "replace"):
+            if len(args) > 2:
+                end = self._clamp_index(args[2])
+            else:
+                end = self._clamp_index(f"{index}+1c")
+            deleted = str(self.tk.call(self._orig, "get", index, end))
+            if deleted:
+                ops.append(EditOp('delete', index, deleted))
+        if inserted:
+            ops.append(EditOp('insert', index, inserted))
+        return ops
+
+    def _mark_dirty(self, line:int, added:int) -> None:
+        ''' Grow the dirty marks to cover an edit starting on line that added
+            the given number of new lines. The range is padded by a line each
+            way to catch words split by the edit. '''
+        first = f"{max(line - 1, 1)}.0"
+        last = str(self.tk.call(self._orig, "index", f"{line + added + 1}.0 lineend"))
+        if self._dirty_pending:
+            # The marks have followed any lines added or removed above them
+            # since they were set, so they can be compared with this edit
+            if self.tk.getboolean(self.tk.call(self._orig, "compare", "dirtyStart", "<", first)):
+                first = "dirtyStart"
+            if self.tk.getboolean(self.tk.call(self._orig, "compare", "dirtyEnd", ">", last)):
+                last = "dirtyEnd"
+        self.tk.call(self._orig, "mark", "set", "dirtyStart", first)
+        self.tk.call(self._orig, "mark", "set", "dirtyEnd", last)
+        self._dirty_pending = True
+
     ###              ###
     # Pending removal? # 
     ###              ###
@@ -312,43 +526,41 @@ class Textbox(Text):
         ''' This method came from a tutorial online and I kinda like the idea,
             but I am not sure if it's worth the effort right now. '''
  
-        index1 = widget.index("insert")
-        index2 = "%s-%sc" % (index1, 1)
-        prevIndex = widget.get(index2, index1)
+        prevIndex = widget.get("insert-1c", "insert")
  
-        prevIndentLine = widget.index(index1 + "linestart")
+        prevIndentLine = widget.index("insert linestart")
         print("prevIndentLine ",prevIndentLine)
         prevIndent = self.getIndex(prevIndentLine)
         print("prevIndent ", prevIndent)
+        # The old loop added an indent per 4 columns of the previous line's 
+        # indent. Work that out up front and insert it all in one go.
+        indents = -(-int(prevIndent.split(".")[1]) // 4)
  
  
         if prevIndex == ":":
             widget.insert("insert", "\n" + "    ")
             widget.mark_set("insert", "insert + 1 line + 4char")
  
-            while widget.compare(prevIndent, ">", prevIndentLine):
-                widget.insert("insert", "     ")
-                widget.mark_set("insert", "insert + 4 chars")
-                prevIndentLine += "+4c"
+            if indents:
+                widget.insert("insert", "     " * indents)
+                widget.mark_set("insert", f"insert + {4 * indents} chars")
             return "break"
          
         elif prevIndent != prevIndentLine:
             widget.insert("insert", "\n")
             widget.mark_set("insert", "insert + 1 line")
  
-            while widget.compare(prevIndent, ">", prevIndentLine):
-                widget.insert("insert", "     ")
-                widget.mark_set("insert", "insert + 4 chars")
-                prevIndentLine += "+4c"
+            if indents:
+                widget.insert("insert", "     " * indents)
+                widget.mark_set("insert", f"insert + {4 * indents} chars")
             return "break"
         
     def getIndex(self, index) -> str:
-        ''' Used by auto indent '''
-        while True:
-            if self.get(index) == " ":
-                index = "%s+%sc" % (index, 1)
-            else:
-                return self.index(index)   
+        ''' Used by auto indent. Finds the first non space from index on the 
+            same line, or the end of the line if it's all spaces. The search 
+            runs in Tk in one call rather than stepping a character at a time. '''
+        found = self.search(r"[^ ]", index, f"{index} lineend", regexp=True)
+        return found if found else self.index(f"{index} lineend")
  
 
 
@@ -359,40 +571,87 @@ class TextLineNumbers(Canvas):
         Canvas.__init__(self, *args,**kwargs)
         self.textwidget = None
         self.color = 'grey'
+        # Built once and shared by every number rather than one per item
+        self._font_normal = Font(family='arial', size=10)
+        self._font_small  = Font(family='arial', size=7)
+        # Canvas items are kept around and keyed by line number so a redraw
+        # only has to move them instead of rebuilding the lot
+        self._items = {}
+        self._item_y = {}
+        # The first and last lines on screen from the last redraw
+        self._viewport = None
 
     def attach(self, text_widget: Textbox) -> None:
         ''' Attach the line numbers to a textbox to retrive line info. '''
         self.textwidget = text_widget
 
-    def redraw(self, *args) -> None:
-        ''' Redraw the line numbers on the canvas '''
-        self.delete("all")
-
-        i = self.textwidget.index("@0,0")
-        # Enter the endless loop
-        while True:
+    def redraw(self, dirty_start:int=None) -> None:
+        ''' Redraw the line numbers on the canvas. Only lines on screen get an
+            item and the ones already drawn are moved rather than recreated. 
+
+            dirty_start is the first line that was edited. If the screen 
+            hasn't scrolled, the numbers above it are left alone. '''
+        first = self.textwidget.index("@0,0")
+        # With wrapping off the numbers only depend on which lines sit at the
+        # top and bottom of the screen, and where. Typing within a line 
+        # leaves all of that alone so there is nothing to do.
+        last = self.textwidget.index("@0,%d" % self.textwidget.winfo_height())
+        viewport = (
+            first, self.textwidget.dlineinfo(first), 
+            last, self.textwidget.dlineinfo(last)
+            )
+        if viewport == self._viewport:
+            return
+        scrolled = self._viewport is None or viewport[:2] != self._viewport[:2]
+        self._viewport = viewport
+
+        # Count the lines here rather than asking Tk for each next index
+        lineno = int(first.split(".")[0])
+        last_lineno = int(last.split(".")[0])
+        if dirty_start is not None and not scrolled and dirty_start > lineno:
+            # Lines above the edit haven't moved, count them as already done.
+            # Only the ones still on screen though, or shrinking the view
+            # would leave the rest behind.
+            dirty_start = min(dirty_start, last_lineno + 1)
+            seen = set(range(lineno, dirty_start))
+            lineno = dirty_start
+        else:
+            seen = set()
+        while lineno <= last_lineno:
             # Get the line dimensions in tuple (x,y,width,height,baseline)
-            dline= self.textwidget.dlineinfo(i)
+            dline= self.textwidget.dlineinfo(f"{lineno}.0")
             # Leave the loop if the line is empty
             if dline is None: 
                 break
             # Get the y coordinate of the line
             y = dline[1] - 2
-            # Get the line number
-            linenum = str(i).split(".")[0]
-            # Set the font size
-            size = 10
-            # 10,000+ lines should be small. Or make the canvas bigger. I like font smaller. 
-            if len(linenum) > 4:
-                size = 7
-            self.create_text(
-                2,                      # x coordinate of the text. 
-                y,
-                anchor="nw", 
-                text=linenum,           
-                font=('arial',size), 
-                tags='lineno',          # Let us get the line numbers later
-                fill=self.color         
-                )
+            seen.add(lineno)
+            item = self._items.get(lineno)
+            if item is None:
+                linenum = str(lineno)
+                # Set the font size
+                font = self._font_normal
+                # 10,000+ lines should be small. Or make the canvas bigger. I like font smaller. 
+                if len(linenum) > 4:
+                    font = self._font_small
+                self._items[lineno] = self.create_text(
+                    2,                      # x coordinate of the text. 
+                    y,
+                    anchor="nw", 
+                    text=linenum,           
+                    font=font, 
+                    tags='lineno',          # Let us get the line numbers later
+                    fill=self.color         
+                    )
+                self._item_y[lineno] = y
+            elif self._item_y[lineno] != y:
+                # The number never changes for a line, only its position
+                self.coords(item, 2, y)
+                self._item_y[lineno] = y
             # Get the next line
-            i = self.textwidget.index("%s+1line" % i)
\ No newline at end of file
+            lineno += 1
+
+        # Clear out numbers that have scrolled off or been deleted
+        for lineno in self._items.keys() - seen:
+            self.delete(self._items.pop(lineno))
+            del self._item_y[lineno]
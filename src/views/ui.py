@@ -80,17 +80,9 @@ class UI:
             # style so they will get updated with the theme.
             tab = self.view.tabs.nametowidget(tab)
             textbox = tab.winfo_children()[0]
-            textbox.config(
-                background=colors.text_background, 
-                foreground=colors.text_foreground, 
-                insertbackground=colors.cursor, 
-
-                highlightbackground=colors.text_background, 
-                highlightcolor=colors.text_background,
-                )
+            textbox.config(insertbackground=colors.cursor, **colors.text_config)
             # Style the line numbers on the side
-            textbox.linenumbers.config(bg=colors.background, highlightbackground=colors.background)
-            textbox.linenumbers.itemconfigure("lineno", fill=colors.text_foreground)
+            textbox.linenumbers.config(**colors.line_number_config)
             
             # Style the syntax highlighting
             textbox.tag_configure("orange", foreground = colors.syn_orange)
@@ -0,0 +1,75 @@
+import sys
+from collections import deque, namedtuple
+
+
+# A single change to the document. The undo stack holds these instead of a 
+# copy of the whole document per keystroke. kind is 'insert' or 'delete'.
+EditOp = namedtuple('EditOp', 'kind index text')
+
+
+class UndoStack:
+    ''' Edits waiting to be undone or redone. The stack is capped both on the
+        number of edits and on the size of the text they hold, so a handful 
+        of big pastes can't sit in memory for the life of the tab. The oldest
+        edits are dropped first. '''
+    def __init__(self, max_ops:int, max_bytes:int) -> None:
+        self._ops = deque()
+        self.max_ops = max_ops
+        self.max_bytes = max_bytes
+        self._bytes = 0
+        # Sits just past the last edit that is currently applied
+        self.cursor = 0
+
+    def __len__(self) -> int:
+        return len(self._ops)
+
+    @property
+    def last(self) -> EditOp:
+        ''' The most recent edit, if it is still applied '''
+        if self._ops and self.cursor == len(self._ops):
+            return self._ops[-1]
+        return None
+
+    def push(self, op:EditOp) -> None:
+        ''' Add an edit. Anything that was undone is dropped. '''
+        while len(self._ops) > self.cursor:
+            self._bytes -= sys.getsizeof(self._ops.pop().text)
+        self._append(op)
+        self._trim()
+        self.cursor = len(self._ops)
+
+    def replace_last(self, op:EditOp) -> None:
+        ''' Swap the most recent edit for op, used when merging edits '''
+        self._bytes -= sys.getsizeof(self._ops.pop().text)
+        self._append(op)
+        # A merged edit is bigger than the one it replaced
+        self._trim()
+        self.cursor = len(self._ops)
+
+    def undo(self) -> EditOp:
+        ''' Step back one edit and return it, or None at the bottom '''
+        if self.cursor == 0:
+            return None
+        self.cursor -= 1
+        return self._ops[self.cursor]
+
+    def redo(self) -> EditOp:
+        ''' Step forward one edit and return it, or None at the top '''
+        if self.cursor == len(self._ops):
+            return None
+        self.cursor += 1
+        return self._ops[self.cursor - 1]
+
+    def _trim(self) -> None:
+        ''' Drop the oldest edits until the stack is back under both caps.
+            The newest edit is always kept, even if it is over budget alone. '''
+        while len(self._ops) > 1 and (
+                len(self._ops) > self.max_ops or self._bytes > self.max_bytes):
+            self._bytes -= sys.getsizeof(self._ops.popleft().text)
+
+    def _append(self, op:EditOp) -> None:
+        # Short bits of text like single words repeat a lot, share them
+        if len(op.text) <= 32:
+            op = op._replace(text=sys.intern(op.text))
+        self._ops.append(op)
+        self._bytes += sys.getsizeof(op.text)